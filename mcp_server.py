@@ -5,21 +5,243 @@ This demonstrates the basic concepts of an MCP server with tools and resources.
 """
 
 import asyncio
-import json
+import collections
+import concurrent.futures
+import inspect
+import operator
+import os
+import re
 import sys
-from typing import Any, Dict, List, Optional
-from dataclasses import dataclass
+import threading
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Mapping, Optional, Set, Tuple, Union
 from datetime import datetime
 
-# MCP Protocol Message Types
-@dataclass
-class MCPMessage:
-    jsonrpc: str = "2.0"
-    id: Optional[str] = None
-    method: Optional[str] = None
-    params: Optional[Dict[str, Any]] = None
-    result: Optional[Any] = None
-    error: Optional[Dict[str, Any]] = None
+# Prefer orjson for message parsing/serialization, fall back to stdlib json.
+# Both paths produce UTF-8 bytes so the write path never goes through str.
+import json
+
+try:
+    import orjson
+
+    JSONDecodeError = orjson.JSONDecodeError
+
+    # orjson only handles integers in [-2**63, 2**64): wider ones are parsed as
+    # floats and can't be serialized. Request ids must be echoed back exactly,
+    # so such messages and responses go through the stdlib instead.
+    def loads(data: bytes) -> Any:
+        message = orjson.loads(data)
+        if isinstance(message, dict):
+            msg_id = message.get("id")
+            if isinstance(msg_id, float) and not -2**63 <= msg_id < 2**64:
+                return json.loads(data)
+        return message
+
+    def dumps(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj)
+        except orjson.JSONEncodeError:
+            return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+except ImportError:
+    loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+# Use the libuv-based event loop when it's installed
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Longest line accepted from stdin
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# Shared read-only stand-in for missing params/arguments
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def _ok(msg_id: Any, result: Any) -> Dict[str, Any]:
+    """Build a JSON-RPC success response"""
+    return {"jsonrpc": "2.0", "id": msg_id, "result": result}
+
+
+def _error_factory(code: int, prefix: str) -> Callable[[Any, Any], bytes]:
+    """Return a builder for serialized error responses with message prefix + detail"""
+    # The serialized prefix keeps its opening quote and the serialized detail
+    # keeps its closing quote, so joining them yields one escaped JSON string.
+    middle = b',"error":{"code":' + str(code).encode() + b',"message":' + dumps(prefix)[:-1]
+
+    def build(msg_id: Any, detail: Any) -> bytes:
+        return b'{"jsonrpc":"2.0","id":' + dumps(msg_id) + middle + dumps(str(detail))[1:] + b"}}"
+
+    return build
+
+
+_parse_error = _error_factory(-32700, "Parse error: ")
+_method_not_found = _error_factory(-32601, "Method not found: ")
+_internal_error = _error_factory(-32603, "Internal error: ")
+_calculation_error = _error_factory(-32602, "Calculation error: ")
+_unknown_tool = _error_factory(-32602, "Unknown tool: ")
+_resource_not_found = _error_factory(-32602, "Resource not found: ")
+
+
+def _ok_raw(msg_id: Any, result_json: bytes) -> bytes:
+    """Build a serialized JSON-RPC success response around a pre-serialized result"""
+    return b'{"jsonrpc":"2.0","id":' + dumps(msg_id) + b',"result":' + result_json + b"}"
+
+
+# A response is either a dict to serialize or an already serialized body
+Response = Union[Dict[str, Any], bytes]
+
+
+# Timestamps only change once a second, so format them once per second:
+# [epoch second, formatted]
+_ts_cache: List[Any] = [None, ""]
+
+
+def now_string() -> str:
+    """Return the current time as a "%Y-%m-%d %H:%M:%S" string"""
+    sec = int(time.time())
+    if _ts_cache[0] != sec:
+        _ts_cache[:] = [sec, datetime.fromtimestamp(sec).strftime("%Y-%m-%d %H:%M:%S")]
+    return _ts_cache[1]
+
+
+# Simulated weather report; the fixed readings are baked into the template so
+# only the city is substituted per call
+_WEATHER_TEXT = "Weather in {city}: {condition}, {temperature}, Humidity: {humidity}".format(
+    city="{}", condition="Sunny", temperature="22°C", humidity="65%"
+).format
+
+# Simulated contents of file://notes.txt, followed by a timestamp
+_NOTES_PREFIX = """Personal Notes
+===============
+
+1. Remember to buy groceries
+2. Call dentist for appointment
+3. Finish MCP server project
+4. Review quarterly reports
+
+Last updated: """
+
+# Deletes every character the calculator accepts; anything left is invalid
+_DEL_ALLOWED = str.maketrans("", "", "0123456789+-*/(). ")
+
+# Arithmetic for the calculate tool: expressions are tokenized and converted
+# to postfix with Dijkstra's shunting-yard algorithm, then evaluated on a stack.
+_TOKEN_RE = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|(\*\*|//|[-+*/()]))")
+
+# operator -> (precedence, right associative, function)
+_BINARY_OPS = {
+    "+": (1, False, operator.add),
+    "-": (1, False, operator.sub),
+    "*": (2, False, operator.mul),
+    "/": (2, False, operator.truediv),
+    "//": (2, False, operator.floordiv),
+    "**": (4, True, operator.pow),
+}
+_UNARY_OPS = {"+": operator.pos, "-": operator.neg}
+# Binds tighter than * and / but looser than **, as in Python: -2 ** 2 == -4
+_UNARY_PRECEDENCE = 3
+_LPAREN = (0, False, None)
+
+# Postfix program: (0, number) pushes a value, (n, func) applies func to n values
+Program = Tuple[Tuple[int, Any], ...]
+
+# Only expressions up to this length are kept in the compile cache, so client
+# input can't pin large strings in memory
+_MAX_CACHED_EXPRESSION = 256
+
+
+def _compile_expression(expression: str) -> Program:
+    """Compile an arithmetic expression to a postfix program"""
+    output: List[Tuple[int, Any]] = []
+    ops: List[Tuple[int, bool, Any]] = []
+    expect_operand = True
+    pos = 0
+
+    while True:
+        match = _TOKEN_RE.match(expression, pos)
+        if match is None:
+            break
+        pos = match.end()
+        number, op = match.groups()
+
+        if number is not None:
+            if not expect_operand:
+                raise ValueError("Invalid expression")
+            if "." in number:
+                value = float(number)
+            elif number[0] == "0" and number.strip("0"):
+                # Python rejects these too (they look like old-style octal)
+                raise ValueError("Leading zeros in integer literals are not permitted")
+            else:
+                value = int(number)
+            output.append((0, value))
+            expect_operand = False
+        elif op == "(":
+            if not expect_operand:
+                raise ValueError("Invalid expression")
+            ops.append(_LPAREN)
+        elif op == ")":
+            if expect_operand:
+                raise ValueError("Invalid expression")
+            while ops and ops[-1] is not _LPAREN:
+                output.append(ops.pop()[2])
+            if not ops:
+                raise ValueError("Unbalanced parentheses")
+            ops.pop()
+        elif expect_operand:
+            if op not in _UNARY_OPS:
+                raise ValueError("Invalid expression")
+            ops.append((_UNARY_PRECEDENCE, True, (1, _UNARY_OPS[op])))
+        else:
+            precedence, right_assoc, func = _BINARY_OPS[op]
+            while ops and ops[-1] is not _LPAREN and (
+                ops[-1][0] > precedence or (ops[-1][0] == precedence and not right_assoc)
+            ):
+                output.append(ops.pop()[2])
+            ops.append((precedence, right_assoc, (2, func)))
+            expect_operand = True
+
+    if expression[pos:].strip():
+        raise ValueError("Invalid characters in expression")
+    if expect_operand:
+        raise ValueError("Invalid expression")
+    while ops:
+        entry = ops.pop()
+        if entry is _LPAREN:
+            raise ValueError("Unbalanced parentheses")
+        output.append(entry[2])
+    return tuple(output)
+
+
+_compile_cached = lru_cache(maxsize=1024)(_compile_expression)
+
+
+def compile_expression(expression: str) -> Program:
+    """Compile an expression, caching the program for short expressions"""
+    if len(expression) <= _MAX_CACHED_EXPRESSION:
+        return _compile_cached(expression)
+    return _compile_expression(expression)
+
+
+def evaluate_expression(expression: str) -> Union[int, float]:
+    """Evaluate a basic arithmetic expression without using eval()"""
+    stack: List[Any] = []
+    for arity, value in compile_expression(expression):
+        if arity == 0:
+            stack.append(value)
+        elif arity == 1:
+            stack[-1] = value(stack[-1])
+        else:
+            rhs = stack.pop()
+            stack[-1] = value(stack[-1], rhs)
+    return stack[0]
 
 class MCPServer:
     def __init__(self):
@@ -62,12 +284,38 @@ class MCPServer:
                 "mimeType": "text/plain"
             }
         }
+
+        # Static results are serialized once; handlers only splice in the id
+        self._initialize_json = dumps({
+            "protocolVersion": "2024-11-05",
+            "capabilities": {
+                "tools": {},
+                "resources": {}
+            },
+            "serverInfo": {
+                "name": "example-mcp-server",
+                "version": "1.0.0"
+            }
+        })
+        self._tools_list_json = dumps({"tools": list(self.tools.values())})
+        self._resources_list_json = dumps({"resources": list(self.resources.values())})
+
+        # Method name -> handler; every handler takes (msg_id, params)
+        self._dispatch = {
+            "initialize": self.handle_initialize,
+            "initialized": self.handle_initialized,
+            "tools/list": self.handle_tools_list,
+            "tools/call": self.handle_tools_call,
+            "resources/list": self.handle_resources_list,
+            "resources/read": self.handle_resources_read,
+            "ping": self.handle_ping,
+        }
     
-    async def handle_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def handle_message(self, message: Dict[str, Any]) -> Optional[Response]:
         """Handle incoming MCP messages"""
         try:
             method = message.get("method")
-            params = message.get("params", {})
+            params = message.get("params") or _EMPTY
             msg_id = message.get("id")
             
             # Handle notifications (messages without id) - these don't need responses
@@ -75,185 +323,281 @@ class MCPServer:
                 print(f"Received notification: {method}", file=sys.stderr)
                 return None
             
-            if method == "initialize":
-                return self.handle_initialize(msg_id, params)
-            elif method == "initialized":
-                # This is a notification sent after initialize - no response needed
-                return None
-            elif method == "tools/list":
-                return self.handle_tools_list(msg_id)
-            elif method == "tools/call":
-                return await self.handle_tools_call(msg_id, params)
-            elif method == "resources/list":
-                return self.handle_resources_list(msg_id)
-            elif method == "resources/read":
-                return self.handle_resources_read(msg_id, params)
-            elif method == "ping":
-                return {"jsonrpc": "2.0", "id": msg_id, "result": {}}
-            else:
-                return {
-                    "jsonrpc": "2.0",
-                    "id": msg_id,
-                    "error": {
-                        "code": -32601,
-                        "message": f"Method not found: {method}"
-                    }
-                }
+            # The method string from the parser is looked up as-is. Interning
+            # it first would take a second dict probe to save a character
+            # compare in this one, which costs more than it saves.
+            handler = self._dispatch.get(method) if isinstance(method, str) else None
+            if handler is None:
+                return _method_not_found(msg_id, method)
+
+            response = handler(msg_id, params)
+            if inspect.iscoroutine(response):
+                response = await response
+            return response
         except Exception as e:
-            return {
-                "jsonrpc": "2.0",
-                "id": message.get("id"),
-                "error": {
-                    "code": -32603,
-                    "message": f"Internal error: {str(e)}"
-                }
-            }
+            return _internal_error(message.get("id"), e)
     
-    def handle_initialize(self, msg_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def handle_initialize(self, msg_id: str, params: Mapping[str, Any]) -> bytes:
         """Handle initialization request"""
-        return {
-            "jsonrpc": "2.0",
-            "id": msg_id,
-            "result": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "tools": {},
-                    "resources": {}
-                },
-                "serverInfo": {
-                    "name": "example-mcp-server",
-                    "version": "1.0.0"
-                }
-            }
-        }
+        return _ok_raw(msg_id, self._initialize_json)
+    
+    def handle_initialized(self, msg_id: str, params: Mapping[str, Any]) -> None:
+        """Sent after initialize - no response needed"""
+        return None
+    
+    def handle_ping(self, msg_id: str, params: Mapping[str, Any]) -> Dict[str, Any]:
+        """Respond to a liveness check"""
+        return _ok(msg_id, {})
     
-    def handle_tools_list(self, msg_id: str) -> Dict[str, Any]:
+    def handle_tools_list(self, msg_id: str, params: Mapping[str, Any]) -> bytes:
         """Return list of available tools"""
-        return {
-            "jsonrpc": "2.0",
-            "id": msg_id,
-            "result": {
-                "tools": list(self.tools.values())
-            }
-        }
+        return _ok_raw(msg_id, self._tools_list_json)
     
-    async def handle_tools_call(self, msg_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    async def handle_tools_call(self, msg_id: str, params: Mapping[str, Any]) -> Response:
         """Execute a tool call"""
         tool_name = params.get("name")
-        arguments = params.get("arguments", {})
+        arguments = params.get("arguments") or _EMPTY
         
         if tool_name == "get_weather":
             city = arguments.get("city", "Unknown")
-            # Simulate weather data
-            weather_data = {
-                "city": city,
-                "temperature": "22°C",
-                "condition": "Sunny",
-                "humidity": "65%",
-                "timestamp": datetime.now().isoformat()
-            }
-            return {
-                "jsonrpc": "2.0",
-                "id": msg_id,
-                "result": {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"Weather in {city}: {weather_data['condition']}, {weather_data['temperature']}, Humidity: {weather_data['humidity']}"
-                        }
-                    ]
-                }
-            }
+            return _ok(msg_id, {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": _WEATHER_TEXT(city)
+                    }
+                ]
+            })
         
         elif tool_name == "calculate":
             expression = arguments.get("expression", "")
             try:
                 # Simple and safe evaluation for basic arithmetic
-                allowed_chars = set("0123456789+-*/(). ")
-                if not all(c in allowed_chars for c in expression):
+                if expression.translate(_DEL_ALLOWED):
                     raise ValueError("Invalid characters in expression")
                 
-                result = eval(expression)
-                return {
-                    "jsonrpc": "2.0",
-                    "id": msg_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": f"{expression} = {result}"
-                            }
-                        ]
-                    }
-                }
+                result = evaluate_expression(expression)
+                return _ok(msg_id, {
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": f"{expression} = {result}"
+                        }
+                    ]
+                })
             except Exception as e:
-                return {
-                    "jsonrpc": "2.0",
-                    "id": msg_id,
-                    "error": {
-                        "code": -32602,
-                        "message": f"Calculation error: {str(e)}"
-                    }
-                }
+                return _calculation_error(msg_id, e)
         
         else:
-            return {
-                "jsonrpc": "2.0",
-                "id": msg_id,
-                "error": {
-                    "code": -32602,
-                    "message": f"Unknown tool: {tool_name}"
-                }
-            }
+            return _unknown_tool(msg_id, tool_name)
     
-    def handle_resources_list(self, msg_id: str) -> Dict[str, Any]:
+    def handle_resources_list(self, msg_id: str, params: Mapping[str, Any]) -> bytes:
         """Return list of available resources"""
-        return {
-            "jsonrpc": "2.0",
-            "id": msg_id,
-            "result": {
-                "resources": list(self.resources.values())
-            }
-        }
+        return _ok_raw(msg_id, self._resources_list_json)
     
-    def handle_resources_read(self, msg_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def handle_resources_read(self, msg_id: str, params: Mapping[str, Any]) -> Response:
         """Read a resource"""
         uri = params.get("uri")
         
         if uri == "file://notes.txt":
             # Simulate reading a notes file
-            notes_content = """Personal Notes
-===============
+            notes_content = _NOTES_PREFIX + now_string()
+            
+            return _ok(msg_id, {
+                "contents": [
+                    {
+                        "uri": uri,
+                        "mimeType": "text/plain",
+                        "text": notes_content
+                    }
+                ]
+            })
+        else:
+            return _resource_not_found(msg_id, uri)
 
-1. Remember to buy groceries
-2. Call dentist for appointment
-3. Finish MCP server project
-4. Review quarterly reports
+class ResponseWriter:
+    """Writes newline-delimited JSON-RPC responses to stdout"""
 
-Last updated: """ + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            return {
-                "jsonrpc": "2.0",
-                "id": msg_id,
-                "result": {
-                    "contents": [
-                        {
-                            "uri": uri,
-                            "mimeType": "text/plain",
-                            "text": notes_content
-                        }
-                    ]
-                }
-            }
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 on_closed: Optional[Callable[[], Any]] = None):
+        self._loop = loop
+        # Write straight to the file descriptor: one syscall per batch, no
+        # buffered/text stream layers in between
+        self._fd = sys.stdout.fileno()
+        # Responses produced during one event loop iteration are collected in
+        # a reusable buffer and written out together
+        self._out = bytearray()
+        self._flush_scheduled = False
+        self._waiting_writable = False
+        # Called once if stdout stops accepting output (e.g. the reader exited)
+        self._on_closed = on_closed
+        self.closed = False
+
+    def send(self, response: Response) -> None:
+        """Queue a response; queued responses are written once per loop iteration"""
+        if self.closed:
+            return
+        out = self._out
+        out.extend(response if isinstance(response, bytes) else dumps(response))
+        out.extend(b"\n")
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        """Write as much of the queued output as stdout accepts"""
+        self._flush_scheduled = False
+        out = self._out
+        while out:
+            try:
+                written = os.write(self._fd, out)
+            except BlockingIOError:
+                # stdout is non-blocking and full; resume once it drains
+                if not self._waiting_writable:
+                    self._waiting_writable = True
+                    self._loop.add_writer(self._fd, self._on_writable)
+                return
+            except OSError as e:
+                print(f"Cannot write to stdout: {e}", file=sys.stderr)
+                self._set_closed()
+                return
+            del out[:written]
+
+    def _on_writable(self) -> None:
+        self._loop.remove_writer(self._fd)
+        self._waiting_writable = False
+        self.flush()
+
+    def _set_closed(self) -> None:
+        self.closed = True
+        self._out.clear()
+        if self._waiting_writable:
+            self._loop.remove_writer(self._fd)
+            self._waiting_writable = False
+        if self._on_closed is not None:
+            on_closed, self._on_closed = self._on_closed, None
+            on_closed()
+
+    def close(self) -> None:
+        """Write out everything still queued, blocking if necessary"""
+        # We're shutting down anyway; don't report a dead stdout back
+        self._on_closed = None
+        if self._waiting_writable:
+            self._loop.remove_writer(self._fd)
+            self._waiting_writable = False
+        if self._out:
+            try:
+                os.set_blocking(self._fd, True)
+            except OSError:
+                pass
+            self.flush()
+
+
+async def open_stdin() -> Callable[[], Awaitable[bytes]]:
+    """Return an async readline() over the raw bytes of stdin
+
+    readline() returns b"" at EOF. A line longer than MAX_MESSAGE_SIZE is
+    discarded up to and including its newline, and reported by raising
+    ValueError once.
+    """
+    loop = asyncio.get_running_loop()
+    too_large = f"Line exceeds {MAX_MESSAGE_SIZE} bytes"
+    # The event loop can only watch pipes and sockets; terminals are also kept
+    # blocking since they usually share their file description with stdout.
+    if not sys.stdin.isatty():
+        reader = asyncio.StreamReader(limit=MAX_MESSAGE_SIZE)
+        try:
+            await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer
+            )
+        except ValueError:
+            pass
         else:
-            return {
-                "jsonrpc": "2.0",
-                "id": msg_id,
-                "error": {
-                    "code": -32602,
-                    "message": f"Resource not found: {uri}"
-                }
-            }
+            async def read_pipe_line() -> bytes:
+                try:
+                    return await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:
+                    return e.partial  # EOF, possibly after an unterminated line
+                except asyncio.LimitOverrunError:
+                    pass
+                # Drop the oversized line, including the part not received yet
+                while True:
+                    try:
+                        await reader.readuntil(b"\n")
+                        break
+                    except asyncio.LimitOverrunError as e:
+                        await reader.readexactly(e.consumed)
+                    except asyncio.IncompleteReadError:
+                        break
+                raise ValueError(too_large)
+
+            return read_pipe_line
+
+    # Fall back to blocking reads in a daemon thread, which can't hold up
+    # interpreter exit while it waits on an idle terminal. Input is read in
+    # blocks and handed over a batch of lines at a time, so the thread only
+    # crosses into the event loop once per block.
+    # os.read() rather than sys.stdin.buffer: a thread parked inside the
+    # buffered reader holds its lock, which interpreter shutdown then needs
+    stdin_fd = sys.stdin.fileno()
+    # None stands in for a discarded oversized line; b"" marks EOF
+    batches: "asyncio.Queue[List[Optional[bytes]]]" = asyncio.Queue(maxsize=16)
+
+    def pump() -> None:
+        partial = bytearray()
+        skipping = False
+        while True:
+            try:
+                chunk = os.read(stdin_fd, 65536)
+            except OSError:
+                chunk = b""
+            batch: List[Optional[bytes]] = []
+            if chunk:
+                *complete, tail = chunk.split(b"\n")
+                for piece in complete:
+                    if skipping:
+                        skipping = False  # newline ending a discarded line
+                        continue
+                    if partial:
+                        partial.extend(piece)
+                        piece = bytes(partial)
+                        partial.clear()
+                    elif not piece:
+                        continue  # blank line
+                    # Up to MAX_MESSAGE_SIZE bytes plus the newline, as on the pipe path
+                    batch.append(piece if len(piece) <= MAX_MESSAGE_SIZE else None)
+                if not skipping:
+                    partial.extend(tail)
+                    if len(partial) > MAX_MESSAGE_SIZE:
+                        partial.clear()
+                        skipping = True
+                        batch.append(None)
+            else:
+                if partial and not skipping:
+                    batch.append(bytes(partial))
+                batch.append(b"")
+            if batch:
+                try:
+                    # Wait for queue space so a large file isn't read all at once
+                    asyncio.run_coroutine_threadsafe(batches.put(batch), loop).result()
+                except (RuntimeError, concurrent.futures.CancelledError):
+                    return  # event loop shut down before taking the batch
+            if not chunk:
+                return
+
+    threading.Thread(target=pump, name="stdin-reader", daemon=True).start()
+    ready: Deque[Optional[bytes]] = collections.deque()
+
+    async def read_thread_line() -> bytes:
+        while not ready:
+            ready.extend(await batches.get())
+        line = ready.popleft()
+        if line is None:
+            raise ValueError(too_large)
+        return line
+
+    return read_thread_line
+
 
 async def main():
     """Main server loop"""
@@ -265,44 +609,84 @@ async def main():
     print("- Resources: file://notes.txt", file=sys.stderr)
     print("Ready for connections.", file=sys.stderr)
     
+    # If stdout goes away there's no one to answer; stop reading input
+    writer = ResponseWriter(asyncio.get_running_loop(), on_closed=asyncio.current_task().cancel)
+    readline = await open_stdin()
+    # Each message is handled in its own task so slow tool calls don't hold
+    # up the rest of the input; keep references until they finish. readline()
+    # doesn't yield while complete lines are buffered, so every queued line is
+    # dispatched before any of them runs and their responses share one write.
+    pending: Set[asyncio.Task] = set()
+
+    async def handle_line(line: bytes) -> None:
+        try:
+            message = loads(line)
+        except (JSONDecodeError, ValueError) as e:
+            print(f"JSON decode error: {e}", file=sys.stderr)
+            writer.send(_parse_error(None, e))
+            return
+
+        try:
+            print(f"Received message: {message.get('method', 'unknown')}", file=sys.stderr)
+            
+            response = await server.handle_message(message)
+            
+            if response is not None:  # Don't send response for notifications
+                writer.send(response)
+        except Exception as e:
+            print(f"Error handling message: {e}", file=sys.stderr)
+
     # Read messages from stdin and write responses to stdout
     try:
         while True:
-            line = sys.stdin.readline()
+            try:
+                line = await readline()
+            except ValueError as e:
+                # Line longer than MAX_MESSAGE_SIZE; the reader has discarded
+                # it through its newline
+                print(f"Message too large: {e}", file=sys.stderr)
+                continue
             if not line:
                 print("No more input, exiting...", file=sys.stderr)
                 break
             
-            line = line.strip()
-            if not line:
+            # The JSON parser tolerates surrounding whitespace, so lines are
+            # passed through unstripped; only skip blank keepalive lines.
+            if line.isspace():
                 continue
                 
-            try:
-                message = json.loads(line)
-                print(f"Received message: {message.get('method', 'unknown')}", file=sys.stderr)
-                
-                response = await server.handle_message(message)
-                
-                if response is not None:  # Don't send response for notifications
-                    print(json.dumps(response))
-                    sys.stdout.flush()
-                    
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {e}", file=sys.stderr)
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32700,
-                        "message": f"Parse error: {str(e)}"
-                    }
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+            task = asyncio.create_task(handle_line(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
                 
+    except asyncio.CancelledError:
+        if not writer.closed:
+            raise
+        print("Output closed, exiting...", file=sys.stderr)
     except KeyboardInterrupt:
         print("Received interrupt, shutting down...", file=sys.stderr)
     except Exception as e:
         print(f"Unexpected error in main loop: {e}", file=sys.stderr)
+    finally:
+        writer.close()
+
+def run() -> None:
+    """Run the server on uvloop if available, else the default event loop"""
+    if uvloop is None:
+        asyncio.run(main())
+    elif sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(main())
+    else:
+        uvloop.install()
+        asyncio.run(main())
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        run()
+    except KeyboardInterrupt:
+        # asyncio turns Ctrl-C into cancelling main() and re-raises it here
+        print("Received interrupt, shutting down...", file=sys.stderr)
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Tests for the calculate tool's expression evaluator.
+Run with: python -m unittest test_mcp_server
+"""
+
+import random
+import unittest
+import warnings
+
+from mcp_server import evaluate_expression
+
+
+class EvaluateExpressionTest(unittest.TestCase):
+    def test_precedence(self):
+        self.assertEqual(evaluate_expression("2 + 3 * 4"), 14)
+        self.assertEqual(evaluate_expression("(2 + 3) * 4"), 20)
+        self.assertEqual(evaluate_expression("10 - 4 - 3"), 3)
+        self.assertEqual(evaluate_expression("2 * 3 ** 2"), 18)
+
+    def test_power_is_right_associative(self):
+        self.assertEqual(evaluate_expression("2 ** 3 ** 2"), 512)
+
+    def test_unary_minus_and_power(self):
+        self.assertEqual(evaluate_expression("-2**2"), -4)
+        self.assertEqual(evaluate_expression("2**-1"), 0.5)
+        self.assertEqual(evaluate_expression("2**-1*3"), 1.5)
+        self.assertEqual(evaluate_expression("--3"), 3)
+
+    def test_division(self):
+        self.assertEqual(evaluate_expression("7 / 2"), 3.5)
+        self.assertEqual(evaluate_expression("7 // 2"), 3)
+        self.assertEqual(evaluate_expression("-7 // 2"), -4)
+        with self.assertRaises(ZeroDivisionError):
+            evaluate_expression("1 / 0")
+        with self.assertRaises(ZeroDivisionError):
+            evaluate_expression("1 // (2 - 2)")
+
+    def test_invalid_parentheses(self):
+        for expression in ("(1", "1)", "()", "(())", "(1)(2)", ""):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    evaluate_expression(expression)
+
+    def test_leading_zeros(self):
+        with self.assertRaises(ValueError):
+            evaluate_expression("01")
+        with self.assertRaises(ValueError):
+            evaluate_expression("20**02")
+        self.assertEqual(evaluate_expression("00"), 0)
+        self.assertEqual(evaluate_expression("01.5"), 1.5)
+
+    def test_matches_eval(self):
+        tokens = ["1", "2", "0", "00", "01", "2.5", ".5", " ",
+                  "+", "-", "*", "/", "//", "**", "(", ")"]
+        rng = random.Random(1234)
+        for _ in range(5000):
+            expression = "".join(rng.choice(tokens) for _ in range(rng.randint(1, 8)))
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    expected = eval(expression)
+            except TypeError:
+                continue  # e.g. "2(1)": a call in Python, not arithmetic
+            except Exception:
+                expected = None
+            if isinstance(expected, tuple):
+                continue  # "()" is an empty tuple in Python
+            with self.subTest(expression=expression):
+                if expected is None:
+                    with self.assertRaises((ValueError, ArithmeticError)):
+                        evaluate_expression(expression)
+                else:
+                    result = evaluate_expression(expression)
+                    self.assertIs(type(result), type(expected))
+                    self.assertEqual(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()